@@ -0,0 +1,74 @@
+"""
+    .. moduleauthor:: Edwin Tye <Edwin.Tye@phe.gov.uk>
+
+    Numerical kernels for the reductions in the loss objects.  These
+    are compiled with numba if it is available so that each loss
+    evaluation is a single pass over the observations, otherwise we
+    fall back to the equivalent NumPy expressions.  All the kernels
+    expect contiguous one dimensional float64 arrays of equal length.
+
+"""
+
+import math
+
+import numpy as np
+from scipy.special import xlogy
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def _squareLoss(y, yhat, w):
+    s = 0.0
+    for i in range(y.shape[0]):
+        r = (y[i] - yhat[i])*w[i]
+        s += r*r
+    return s
+
+def _normalLoss(y, yhat, invSigma2):
+    s = 0.0
+    for i in range(y.shape[0]):
+        r = y[i] - yhat[i]
+        s += r*r*invSigma2[i]
+    return 0.5*s
+
+def _poissonLoss(y, yhat):
+    s = 0.0
+    for i in range(y.shape[0]):
+        if y[i] == 0.0:
+            s += yhat[i]
+        elif yhat[i] == 0.0:
+            # log(0), same as the compiled and NumPy versions
+            s += math.inf
+        else:
+            s += yhat[i] - y[i]*math.log(yhat[i])
+    return s
+
+def _squareLossNumpy(y, yhat, w):
+    return (((y - yhat)*w)**2).sum()
+
+def _normalLossNumpy(y, yhat, invSigma2):
+    r = y - yhat
+    return 0.5*(r*r*invSigma2).sum()
+
+def _poissonLossNumpy(y, yhat):
+    return (yhat - xlogy(y, yhat)).sum()
+
+if njit is None:
+    squareLoss = _squareLossNumpy
+    normalLoss = _normalLossNumpy
+    poissonLoss = _poissonLossNumpy
+else:
+    # no fastmath because the optimizer relies on inf and nan
+    # propagating through the loss when the integration fails
+    squareLoss = njit(nogil=True, cache=True)(_squareLoss)
+    normalLoss = njit(nogil=True, cache=True)(_normalLoss)
+    poissonLoss = njit(nogil=True, cache=True)(_poissonLoss)
+
+def asFlatArray(x):
+    '''
+    A contiguous one dimensional float64 view of x, copying
+    only when necessary.
+    '''
+    return np.ascontiguousarray(x, dtype=np.float64).ravel()
@@ -947,6 +947,45 @@ class BaseLoss(object):
 
         return np.nan_to_num(c) if c == np.inf else c
 
+    def cost_many(self, theta, parallel=False):
+        """
+        Find the cost/loss for a collection of parameters, i.e. an
+        ensemble of parameters or multiple starting points of an
+        optimization.  Each set of parameters requires an independent
+        integration so they can be evaluated in parallel.
+
+        Parameters
+        ----------
+        theta: array like
+            of shape [number of parameter sets x number of parameters]
+        parallel: bool, optional
+            Defaults to False, if True, the evaluations are distributed
+            using dask
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            the cost of each set of parameters
+
+        See also
+        --------
+        :meth:`cost`
+
+        """
+        theta = ode_utils.check_array_type(theta)
+        if theta.ndim == 1:
+            theta = theta.reshape(1, len(theta))
+
+        if parallel:
+            import dask.bag
+            # each worker receives its own copy of the object, so the
+            # parameters being set in cost do not interfere
+            c = dask.bag.from_sequence(list(theta)).map(self.cost).compute()
+        else:
+            c = [self.cost(theta_i) for theta_i in theta]
+
+        return np.array(c)
+
     def diff_loss(self, theta=None):
         """
         Find the derivative of the loss function given time points
@@ -13,10 +13,11 @@ __all__ = [
     ]
 
 import numpy as np
+from scipy.special import gammaln
 
+from pygom.loss import _kernels
 from pygom.model._model_errors import InitializeError
 from pygom.model.ode_utils import check_array_type
-from pygom.utilR.distn import dnorm, dpois
 
 class InputError(Exception):
     '''
@@ -51,6 +52,8 @@ class Square(object):
         assert self._y.shape == self._w.shape, \
             "Input weight not of the same size as y"
 
+        self._yFlat = _kernels.asFlatArray(self._y)
+        self._wFlat = _kernels.asFlatArray(self._w)
         self.loss(self._y)
 
     def loss(self, yhat):
@@ -66,7 +69,9 @@ class Square(object):
         -------
         :math:`\\sum_{i=1}^{n} (\\hat{y} - y)^{2}`
         '''
-        return (self.residual(yhat)**2).sum()
+        return _kernels.squareLoss(self._yFlat,
+                                   _flatYhat(yhat, self._yFlat),
+                                   self._wFlat)
 
     def diff_loss(self, yhat):
         '''
@@ -123,18 +128,7 @@ class Square(object):
         '''
         Find the weighted residuals.
         '''
-        # resid = self._y - yhat
-        # print "In weighted resid"
-        # print self._y.shape
-        if len(yhat.shape) > 1:
-            if 1 in yhat.shape:
-                resid = self._y - yhat.ravel()
-            else:
-                resid = self._y - yhat
-        else:
-            resid = self._y - yhat
-
-        return resid * self._w
+        return (self._y - _flattenColumn(yhat)) * self._w
 
 class Normal(object):
     '''
@@ -170,7 +164,13 @@ class Normal(object):
         else:
             raise InitializeError(err_str + "type")
 
+        # constants of the log-likelihood that do not depend on yhat
         self._sigma2 = self._sigma**2
+        self._invSigma2 = 1.0/self._sigma2
+        self._logNormConst = (np.log(self._sigma).sum() +
+                              0.5*np.log(2*np.pi)*self._y.size)
+        self._yFlat = _kernels.asFlatArray(self._y)
+        self._invSigma2Flat = _kernels.asFlatArray(self._invSigma2)
         self.loss(self._y)
 
     def loss(self, yhat):
@@ -188,11 +188,9 @@ class Normal(object):
         negative log-likelihood, :math:`\\mathcal{L}(\\hat{y},y)`
 
         '''
-        # note that we input the standard deviation here
-        if len(yhat.shape) > 1:
-            if 1 in yhat.shape:
-                yhat = yhat.ravel()
-        return (-dnorm(self._y, yhat, self._sigma, True)).sum()
+        return _kernels.normalLoss(self._yFlat,
+                                   _flatYhat(yhat, self._yFlat),
+                                   self._invSigma2Flat) + self._logNormConst
 
     def diff_loss(self, yhat):
         '''
@@ -210,8 +208,7 @@ class Normal(object):
             :math:`\\nabla \\mathcal{L}(\\hat{y}, y)`
 
         '''
-        r = self.residual(yhat)
-        return -r/self._sigma2
+        return -self.residual(yhat)*self._invSigma2
 
     def diff2Loss(self, yhat):
         '''
@@ -227,7 +224,7 @@ class Normal(object):
         s: array like
             inverse of the variance with shape = yhat.shape
         '''
-        return np.ones(yhat.shape)/self._sigma2
+        return np.ones(yhat.shape)*self._invSigma2
 
     def residual(self, yhat):
         '''
@@ -244,15 +241,7 @@ class Normal(object):
             residuals
 
         '''
-        if len(yhat.shape) > 1:
-            if 1 in yhat.shape:
-                resid = self._y - yhat.ravel()
-            else:
-                resid = self._y - yhat
-        else:
-            resid = self._y - yhat
-
-        return resid
+        return self._y - _flattenColumn(yhat)
 
 class Poisson(object):
     '''
@@ -261,11 +250,16 @@ class Poisson(object):
     Parameters
     ----------
     y: array like
-        observation
+        observation, which are counts and hence integer valued
     '''
 
     def __init__(self, y):
         self._y = check_array_type(y)
+        if np.any(self._y != np.round(self._y)):
+            raise InputError("Observations of a Poisson loss must be integer")
+        # log(y!) is constant w.r.t. yhat
+        self._logFactY = gammaln(self._y + 1).sum()
+        self._yFlat = _kernels.asFlatArray(self._y)
         self.loss(self._y)
 
     def loss(self, yhat):
@@ -283,11 +277,8 @@ class Poisson(object):
         negative log-likelihood, :math:`\\mathcal{L}(\\hat{y}, y)`
 
         '''
-        if len(yhat.shape) > 1:
-            if 1 in yhat.shape:
-                yhat = yhat.ravel()
-        # note that we input the standard deviation here
-        return (-dpois(self._y, yhat, True)).sum()
+        return _kernels.poissonLoss(self._yFlat,
+                                    _flatYhat(yhat, self._yFlat)) + self._logFactY
 
     def diff_loss(self, yhat):
         '''
@@ -303,10 +294,7 @@ class Poisson(object):
         :math:`\\nabla \\mathcal{L}(\\hat{y},y)`
 
         '''
-        if len(yhat.shape) > 1:
-            if 1 in yhat.shape:
-                yhat = yhat.ravel()
-        return 1 - self._y/yhat
+        return 1 - self._y/_flattenColumn(yhat)
 
     def diff2Loss(self, yhat):
         '''
@@ -322,7 +310,7 @@ class Poisson(object):
         s: array like
             :math:`\\frac{y}{\\hat{y}^{2}}` with shape = yhat.shape
         '''
-        return self.y/(yhat**2)
+        return self._y/(_flattenColumn(yhat)**2)
 
     def residual(self, yhat):
         '''
@@ -339,8 +327,24 @@ class Poisson(object):
             residuals
 
         '''
-        if len(yhat.shape) > 1:
-            if 1 in yhat.shape:
-                yhat = yhat.ravel()
-        return self._y - yhat
+        return self._y - _flattenColumn(yhat)
+
+def _flattenColumn(yhat):
+    '''
+    Flatten yhat if it is a column (or row) vector so that it conforms
+    with the observations, otherwise return it untouched.
+    '''
+    if yhat.ndim > 1 and 1 in yhat.shape:
+        return yhat.ravel()
+    else:
+        return yhat
 
+def _flatYhat(yhat, yFlat):
+    '''
+    Flatten yhat into the contiguous float64 layout expected by the
+    kernels, making sure that it conforms with the observations.
+    '''
+    yhat = _kernels.asFlatArray(yhat)
+    if yhat.size != yFlat.size:
+        raise InputError("Input yhat not of the same size as y")
+    return yhat
@@ -6,11 +6,13 @@
 
 """
 import re
-from functools import reduce
+from functools import lru_cache
+from itertools import chain
 
 import sympy
 from sympy.matrices import MatrixBase
 import numpy as np
+import scipy.sparse
 
 from .base_ode_model import BaseOdeModel
 from .transition import TransitionType
@@ -85,13 +87,23 @@ def _makeEquationPretty(eq, param):
     back to png) and only available from graphviz versions after
     14 Oct 2011
     """
-    for p in param:
-        if p.lower() in greekLetter:
-            eq = re.sub('(\\W?)(' + p + ')(\\W?)', '\\1&' + p + ';\\3', eq)
-    # eq = re.sub('\*{1}[^\*]', '', eq)
-    # eq = re.sub('([^\*]?)\*([^\*]?)', '\\1 \\2', eq)
-    # eq += " blah<SUP>Yo</SUP> + ha<SUB>Boo</SUB>"
-    return eq
+    greek_param = tuple(p for p in param if p.lower() in greekLetter)
+    if len(greek_param) == 0:
+        return eq
+    else:
+        return _greekPattern(greek_param).sub('&\\g<0>;', eq)
+
+
+@lru_cache(maxsize=128)
+def _greekPattern(greek_param):
+    """
+    A single compiled pattern matching any of the parameters so that
+    the equation is scanned once rather than once per parameter.  The
+    longest names are tried first so that, e.g. beta is not converted
+    as b&eta;
+    """
+    names = sorted(greek_param, key=len, reverse=True)
+    return re.compile('|'.join(map(re.escape, names)))
 
 
 def generateDirectedDependencyGraph(ode_matrix, transition=None):
@@ -110,11 +122,13 @@ def generateDirectedDependencyGraph(ode_matrix, transition=None):
 
     Returns
     -------
-    G: :class:`numpy.ndarray`
-        Two dimensional array of size [number of state x number of transitions]
-        where each column has two entry,
-        -1 and 1 to indicate the direction of the transition and the state.
-        All column sum to one, i.e. transition must have a source and target.
+    G: :class:`scipy.sparse.csr_matrix`
+        Two dimensional sparse matrix of size
+        [number of state x number of transitions] and dtype int8 where
+        each column has two entry, -1 and 1 to indicate the direction of
+        the transition and the state. All column sum to one, i.e.
+        transition must have a source and target.  Use G.toarray() for
+        the dense version.
     """
     assert isinstance(ode_matrix, MatrixBase), \
         "Expecting a vector of expressions"
@@ -124,15 +138,24 @@ def generateDirectedDependencyGraph(ode_matrix, transition=None):
     else:
         assert isinstance(transition, list), "Require a list of transitions"
 
-    B = np.zeros((len(ode_matrix), len(transition)))
-    for i, a in enumerate(ode_matrix):
-        for j, transitionTuple in enumerate(transition):
-            t1, t2 = transitionTuple
-            if _hasExpression(a, t1):
-                B[i, j] += -1  # going out
-            if _hasExpression(a, t2):
-                B[i, j] += 1   # coming in
-    return B
+    term_sets = _expressionSets(ode_matrix)
+    t_out = [t1 for t1, _t2 in transition]
+    t_in = [t2 for _t1, t2 in transition]
+
+    # each state only has a handful of the transitions so we only
+    # store the non-zero entries
+    n = len(transition)
+    B = scipy.sparse.lil_matrix((len(ode_matrix), n), dtype=np.int8)
+    for i, a_set in enumerate(term_sets):
+        # occurrence of the terms, going out and coming in
+        M_i = np.fromiter((t in a_set for t in t_out), dtype=bool, count=n)
+        N_i = np.fromiter((t in a_set for t in t_in), dtype=bool, count=n)
+        B_i = N_i.astype(np.int8) - M_i
+        j = np.flatnonzero(B_i)
+        if len(j) > 0:
+            B[i, j] = B_i[j]
+
+    return B.tocsr()
 
 
 def getUnmatchedExpressionVector(expr_vec, full_output=False):
@@ -154,9 +177,10 @@ def getUnmatchedExpressionVector(expr_vec, full_output=False):
     assert isinstance(expr_vec, MatrixBase), \
         "Expecting a vector of expressions"
 
-    transition = reduce(lambda x, y: x + y, map(getExpressions, expr_vec))
+    transition = _uniqueExpressions(expr_vec)
     matched_transition_list = _findMatchingExpression(transition)
-    out = list(set(transition) - set(matched_transition_list))
+    matched_set = set(matched_transition_list)
+    out = [t for t in transition if t not in matched_set]
 
     if full_output:
         return out, _transitionListToMatchedTuple(matched_transition_list)
@@ -185,11 +209,7 @@ def getMatchingExpressionVector(expr_vec, outTuple=False):
     assert isinstance(expr_vec, MatrixBase), \
         "Expecting a vector of expressions"
 
-    transition = list()
-    for expr in expr_vec:
-        transition += getExpressions(expr)
-
-    transition = list(set(_findMatchingExpression(transition)))
+    transition = _findMatchingExpression(_uniqueExpressions(expr_vec))
 
     if outTuple:
         return _transitionListToMatchedTuple(transition)
@@ -215,16 +235,14 @@ def _findMatchingExpression(expressions, full_output=False):
         of expressions that was matched
     """
     t_list = list()
-    for i in range(len(expressions) - 1):
-        for j in range(i + 1, len(expressions)):
-            b = expressions[i] + expressions[j]
-            if b == 0:
-                t_list.append(expressions[i])
-                t_list.append(expressions[j])
+    for i, j in _matchingPairs(expressions):
+        t_list.append(expressions[i])
+        t_list.append(expressions[j])
 
     if full_output:
-        unmatched = set(expressions) - set(t_list)
-        return t_list, list(unmatched)
+        matched_set = set(t_list)
+        unmatched = [t for t in expressions if t not in matched_set]
+        return t_list, unmatched
     else:
         return t_list
 
@@ -236,28 +254,74 @@ def _transitionListToMatchedTuple(transition):
     of the tuple is the positive term
     """
     t_tuple_list = list()
-    for i in range(len(transition) - 1):
-        for j in range(i + 1, len(transition)):
-            b = transition[i] + transition[j]
-            # the two terms cancel out
-            if b == 0:
-                if sympy.Integer(-1) in getLeafs(transition[i]):
-                    t_tuple_list.append((transition[j], transition[i]))
-                else:
-                    t_tuple_list.append((transition[i], transition[j]))
+    for i, j in _matchingPairs(transition):
+        if sympy.Integer(-1) in getLeafs(transition[i]):
+            t_tuple_list.append((transition[j], transition[i]))
+        else:
+            t_tuple_list.append((transition[i], transition[j]))
     return t_tuple_list
 
 
+def _matchingPairs(expressions):
+    """
+    Find all the pairs of index (i, j) with i < j where the two
+    expressions cancel out, i.e. expressions[i] + expressions[j] == 0.
+    Instead of adding every pair of expressions, we hash each expression
+    and look up its negation, which sympy canonicalizes on construction.
+
+    Returns
+    -------
+    list:
+        of tuples (i, j), in the same order as a pairwise search
+    """
+    index = dict()
+    for j, expr in enumerate(expressions):
+        index.setdefault(expr, list()).append(j)
+
+    pairs = list()
+    for i, expr in enumerate(expressions):
+        pairs += [(i, j) for j in index.get(-expr, ()) if j > i]
+    pairs.sort()
+    return pairs
+
+
+def _uniqueExpressions(expr_vec):
+    """
+    The expressions from all the equations without duplicates, in the
+    order that they first appear.  The order must not depend on the
+    hash of the expressions, which changes between Python processes,
+    else the decomposition of the ode will change from run to run.
+    """
+    return list(dict.fromkeys(chain.from_iterable(map(getExpressions,
+                                                      expr_vec))))
+
+
+@lru_cache(maxsize=4096)
 def getExpressions(expr):
+    """
+    The expressions, i.e. terms, in the expanded form of expr without
+    duplicates and in the order that they appear
+    """
     input_dict = dict()
-    _getExpression(expr.expand(), input_dict)
-    return list(input_dict.keys())
+    _getExpression(_expand(expr), input_dict)
+    return tuple(input_dict)
 
 
+@lru_cache(maxsize=4096)
 def getLeafs(expr):
     input_dict = dict()
-    _getLeaf(expr.expand(), input_dict)
-    return list(input_dict.keys())
+    _getLeaf(_expand(expr), input_dict)
+    return tuple(input_dict.keys())
+
+
+@lru_cache(maxsize=4096)
+def _expand(expr):
+    """
+    Memoized expr.expand(), the same ode is expanded repeatedly when
+    we decompose it into transitions.  This is safe because sympy
+    expressions are immutable.
+    """
+    return expr.expand()
 
 
 def _getLeaf(expr, input_dict):
@@ -268,15 +332,14 @@ def _getLeaf(expr, input_dict):
     down to (x,2) in expr.atoms() but this function will
     retain (x**2)
     """
-    t = expr.args
-    t_lengths = np.array(list(map(_expressionLength, t)))
-
-    for i, ti in enumerate(t):
-        if t_lengths[i] == 0:
+    for ti in expr.args:
+        # only a product is broken down further, everything
+        # else including power terms are leafs
+        if type(ti) is sympy.Mul:
+            _getLeaf(ti, input_dict)
+        else:
             input_dict.setdefault(ti, 0)
             input_dict[ti] += 1
-        else:
-            _getLeaf(ti, input_dict)
 
 
 def _getExpression(expr, input_dict):
@@ -286,43 +349,23 @@ def _getExpression(expr, input_dict):
     Only return expressions and not the individual elements
     """
     t = expr.args if len(expr.atoms()) > 1 else [expr]
-    # print t
 
-    # find out the length of the components within this node
-    t_lengths = np.array(list(map(_expressionLength, t)))
-    # print(tLengths)
-    if np.all(t_lengths == 0):
+    # a component is a leaf unless it is a product, power terms
+    # i.e. x^2 are treated as a single leaf
+    is_mul = [type(ti) is sympy.Mul for ti in t]
+    if not any(is_mul):
         # if all components are leafs, then the node is an expression
         input_dict.setdefault(expr, 0)
         input_dict[expr] += 1
     else:
-        for i, ti in enumerate(t):
+        for ti, ti_is_mul in zip(t, is_mul):
             # if the leaf is a singleton, then it is an expression
             # else, go further along the tree
-            if t_lengths[i] == 0:
+            if ti_is_mul:
+                _getExpression(ti, input_dict)
+            else:
                 input_dict.setdefault(ti, 0)
                 input_dict[ti] += 1
-            else:
-                if isinstance(ti, sympy.Mul):
-                    _getExpression(ti, input_dict)
-                elif isinstance(ti, sympy.Pow):
-                    input_dict.setdefault(ti, 0)
-                    input_dict[ti] += 1
-
-
-def _expressionLength(expr):
-    """
-    Returns the length of the expression i.e. number of terms.
-    If the expression is a power term, i.e. x^2 then we assume
-    that it is one term and return 0.
-    """
-    # print type(expr)
-    if isinstance(expr, sympy.Mul):
-        return len(expr.args)
-    elif isinstance(expr, sympy.Pow):
-        return 0
-    else:
-        return 0
 
 
 def _findIndex(eq_vec, expr):
@@ -343,28 +386,36 @@ def _findIndex(eq_vec, expr):
         of index that contains the expression.  Can be an empty list
         or with multiple integer
     """
-    out = list()
-    for i, a in enumerate(eq_vec):
-        j = _hasExpression(a, expr)
-        if j is True:
-            out.append(i)
-    return out
+    return [i for i, a_set in enumerate(_expressionSets(eq_vec))
+            if expr in a_set]
 
 
 def _hasExpression(eq, expr):
     """
     Test whether the equation eq has the expression expr
     """
-    out = False
-    aExpand = eq.expand()
-    if expr == aExpand:
-        out = True
-    if expr in aExpand.args:
-        out = True
-    return out
+    return expr in _expressionSet(eq)
+
+
+def _expressionSet(eq):
+    """
+    The set of expressions that :func:`_hasExpression` tests against,
+    i.e. the expanded equation itself and its arguments.  Computing this
+    once per equation avoids expanding the same equation for every
+    expression that we are looking for.
+    """
+    a_expand = _expand(eq)
+    return frozenset(a_expand.args).union([a_expand])
+
+
+def _expressionSets(eq_vec):
+    """
+    Apply :func:`_expressionSet` to every element of a vector of equations
+    """
+    return [_expressionSet(a) for a in eq_vec]
 
 
-def pureTransitionToOde(A):
+def pureTransitionToOde(A, simplify=False):
     """
     Get the ode from a pure transition matrix
 
@@ -372,6 +423,10 @@ def pureTransitionToOde(A):
     ----------
     A: `sympy.Matrix`
         a transition matrix of size [n \times n]
+    simplify: bool, optional
+        Defaults to False, if True, simplify the resulting ode.  Callers
+        that compare the ode against another one should simplify the
+        difference instead.
 
     Returns
     -------
@@ -380,23 +435,30 @@ def pureTransitionToOde(A):
     """
     nrow, ncol = A.shape
     assert nrow == ncol, "Need a square matrix"
-    B = [sum(A[:, i]) - sum(A[i, :]) for i in range(nrow)]
-    return sympy.simplify(sympy.Matrix(B))
+    # one reduction over the rows and columns instead of slicing
+    # the sympy matrix twice for every state
+    A_np = np.array(A.tolist(), dtype=object)
+    B = sympy.Matrix(A_np.sum(axis=0) - A_np.sum(axis=1))
+    return sympy.simplify(B) if simplify else B
 
 
 def stripBDFromOde(fx, bd_list=None):
     if bd_list is None:
         bd_list = getUnmatchedExpressionVector(fx, False)
 
-    fx_copy = fx.copy()
+    fx_copy = sympy.Matrix(fx)
     for i, fxi in enumerate(fx):
-        term_in_expr = list(map(lambda x: x in fxi.expand().args, bd_list))
-        for j, term in enumerate(bd_list):
-            fx_copy[i] -= term if term_in_expr[j] else 0
+        fxi_expand = _expand(fxi)
+        args_set = frozenset(fxi_expand.args)
+        to_remove = [term for term in bd_list if term in args_set]
+        if len(to_remove) > 0:
+            # a single subtraction for all the birth and death terms, then
+            # simplify to keep the transitions compact, else models such as
+            # Legrand_Ebola_SEIHFR expand into terms that are very expensive
+            # to compare later on
+            fx_copy[i] = sympy.simplify(fxi - sympy.Add(*to_remove))
 
-    # simplify converts it to an ImmutableMatrix, so we make it into
-    # a mutable object again because we want the expanded form
-    return sympy.Matrix(sympy.simplify(fx_copy)).expand()
+    return fx_copy.expand()
 
 
 def odeToPureTransition(fx, states, output_remain=False):
@@ -407,8 +469,13 @@ def odeToPureTransition(fx, states, output_remain=False):
     A, remain_terms = _odeToPureTransition(fx, remain_terms, A)
     # checking if our decomposition is correct
     fx1 = pureTransitionToOde(A)
-    diff_ode = sympy.simplify(fx - fx1)
-    if np.all(np.array(map(lambda x: x == 0, diff_ode)) == True):
+    diff_ode = (fx - fx1).expand()
+    if any(x != 0 for x in diff_ode):
+        # expanding is usually enough to cancel everything out, only
+        # resort to the (much more expensive) simplify when it is not
+        diff_ode = sympy.simplify(diff_ode)
+
+    if all(x == 0 for x in diff_ode):
         if output_remain:
             return A, remain_terms
         else:
@@ -423,7 +490,7 @@ def odeToPureTransition(fx, states, output_remain=False):
         # if it helps.
         # TODO: increase robustness so if it does not help, then we
         # either bail out or revert to the normal version
-        diff_term_list = map(lambda x_y: (x_y[1], x_y[0]), diff_term_list)
+        diff_term_list = [(y, x) for x, y in diff_term_list]
         A, remain_terms = _singleOriginTransition(diff_ode, diff_term_list,
                                                   states, A)
         AA, remain_terms = _odeToPureTransition(diff_ode, remain_terms, A)
@@ -463,14 +530,15 @@ def _odeToPureTransition(fx, terms=None, A=None):
     if A is None:
         A = sympy.zeros(len(fx), len(fx))
 
+    term_sets = _expressionSets(fx)
     remain_transition = list()
     for t1, t2 in terms:
         remain = True
-        for i, aFrom in enumerate(fx):
-            if _hasExpression(aFrom, t2):
+        for i, a_from in enumerate(term_sets):
+            if t2 in a_from:
                 # arriving at
-                for j, aTo in enumerate(fx):
-                    if _hasExpression(aTo, t1):
+                for j, a_to in enumerate(term_sets):
+                    if t1 in a_to:
                         A[i, j] += t1  # from i to j
                         remain = False
         if remain:
@@ -483,6 +551,7 @@ def _singleOriginTransition(fx, term_list, states, A=None):
     if A is None:
         A = sympy.zeros(len(fx), len(fx))
 
+    term_sets = _expressionSets(fx)
     remain_term_list = list()
     for k, transition_tuple in enumerate(term_list):
         t1, t2 = transition_tuple
@@ -492,9 +561,8 @@ def _singleOriginTransition(fx, term_list, states, A=None):
             if s in t1.atoms():
                 possible_origin.append(i)
         if len(possible_origin) == 1:
-            for j, fxj in enumerate(fx):
-                # print(t1, fxj, possibleOrigin[0] != j, _hasExpression(fxj, t2))
-                if possible_origin[0] != j and _hasExpression(fxj, t1):
+            for j, fxj_set in enumerate(term_sets):
+                if possible_origin[0] != j and t1 in fxj_set:
                     A[possible_origin[0], j] += t1
                     remain = False
                     # print(t1, possibleOrigin, j, fxj, "\n")
@@ -467,6 +467,20 @@ def matToVecFF(FF, numState, numParam):
     '''
     return FF.ravel()
 
+def _lambdifyNumpy(inputSymb, inputExpr):
+    '''
+    lambdify the expression against numpy.  The common subexpressions,
+    which are plentiful in the Jacobian and sensitivities of an ode, are
+    hoisted out and evaluated once if the installed version of sympy
+    supports it.
+    '''
+    try:
+        return lambdify(expr=inputExpr, args=inputSymb,
+                        modules='numpy', cse=True)
+    except TypeError:
+        # sympy < 1.9 does not have the cse argument
+        return lambdify(expr=inputExpr, args=inputSymb, modules='numpy')
+
 class compileCode(object):
     '''
     A class that compiles an algebraic expression in sympy to a faster
@@ -556,9 +570,7 @@ class compileCode(object):
                                         backend='f2py')
                 compileTypeChosen = 'np'
             elif backend == 'lambda':
-                compiledFunc = lambdify(expr=inputExpr,
-                                        args=inputSymb,
-                                        modules='numpy')
+                compiledFunc = _lambdifyNumpy(inputSymb, inputExpr)
                 compileTypeChosen = 'np'
             elif backend.lower() in ('cython', 'np'):
                 # note that we have another test layer because of the
@@ -577,9 +589,7 @@ class compileCode(object):
                                                 backend='f2py')
                         compileTypeChosen = 'np'
                     except:
-                        compiledFunc = lambdify(expr=inputExpr,
-                                                args=inputSymb,
-                                                modules='numpy')
+                        compiledFunc = _lambdifyNumpy(inputSymb, inputExpr)
                         compileTypeChosen = 'np'
             else:
                 raise ExpressionErrror("The problem is too tough")
@@ -952,7 +952,8 @@ class SimulateOde(DeterministicOde):
         if len(bdList) > 0:
             M = self._generateTransitionMatrix(A)
 
-            A1 = _ode_composition.pureTransitionToOde(M)
+            # the simplified ode keeps the difference below compact
+            A1 = _ode_composition.pureTransitionToOde(M, simplify=True)
             diffA = sympy.simplify(A - A1)
 
             # get our birth and death process
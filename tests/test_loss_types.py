@@ -1,8 +1,11 @@
 from unittest import main, TestCase
 
 import numpy as np
+import scipy.stats
 
-from pygom import SquareLoss, NormalLoss
+from pygom import SquareLoss, NormalLoss, Normal, Poisson
+from pygom.loss import _kernels
+from pygom.loss.loss_type import InputError
 from pygom.model import common_models
 
 class TestLossTypes(TestCase):
@@ -65,6 +68,46 @@ class TestLossTypes(TestCase):
         self.assertFalse(np.allclose(objFH.cost(), objFH1.cost()))
         self.assertFalse(np.allclose(objFH1.cost(), objFH2.cost()))
 
+    def test_Normal_Poisson_loglik(self):
+        # closed form negative log-likelihood against scipy
+        y = np.random.poisson(5.0, (29, 2)).astype('float64')
+        yhat = y + np.random.rand(29, 2)
+        sigma = np.random.rand(29, 2) + 0.5
+
+        s = -scipy.stats.norm.logpdf(y, yhat, sigma).sum()
+        self.assertTrue(np.allclose(Normal(y, sigma).loss(yhat), s))
+
+        s = -scipy.stats.poisson.logpmf(y, yhat).sum()
+        self.assertTrue(np.allclose(Poisson(y).loss(yhat), s))
+
+        # the Poisson likelihood is only defined for counts
+        self.assertRaises(InputError, Poisson, np.array([0.5, 2.2, 1.1]))
+
+    def test_kernels(self):
+        # the loops, which numba compiles, against the NumPy fallback
+        # that is used when numba is not installed
+        y = np.random.poisson(5.0, 50).astype('float64')
+        yhat = y + np.random.rand(50)
+        w = np.random.rand(50)
+        # Poisson with no observation and/or no prediction
+        y[:3] = 0.0
+        yhat[1:3] = 0.0
+
+        self.assertTrue(np.allclose(_kernels._squareLoss(y, yhat, w),
+                                    _kernels._squareLossNumpy(y, yhat, w)))
+        self.assertTrue(np.allclose(_kernels._normalLoss(y, yhat, w),
+                                    _kernels._normalLossNumpy(y, yhat, w)))
+        self.assertTrue(np.allclose(_kernels._poissonLoss(y, yhat),
+                                    _kernels._poissonLossNumpy(y, yhat)))
+        self.assertTrue(np.allclose(_kernels.poissonLoss(y, yhat),
+                                    _kernels._poissonLossNumpy(y, yhat)))
+
+        # a prediction of zero for a positive observation
+        yhat[3] = 0.0
+        self.assertEqual(_kernels._poissonLoss(y, yhat), np.inf)
+        self.assertEqual(_kernels._poissonLossNumpy(y, yhat), np.inf)
+        self.assertEqual(_kernels.poissonLoss(y, yhat), np.inf)
+
     def test_FH_Square_1State_Fail(self):
         ## totalFail = 0
         ## expectedFail = 4
@@ -1,10 +1,19 @@
+import os
+import subprocess
+import sys
 from unittest import main, TestCase
 
 import numpy
 import sympy
 
+import pygom
 from pygom import SimulateOde, Transition, TransitionType
 from pygom.model import common_models
+from pygom.model._ode_composition import (generateDirectedDependencyGraph,
+                                          odeToPureTransition,
+                                          pureTransitionToOde,
+                                          stripBDFromOde,
+                                          _makeEquationPretty)
 
 
 class TestOdeDecomposition(TestCase):
@@ -91,6 +100,55 @@ class TestOdeDecomposition(TestCase):
 
         self.assertTrue(numpy.all(numpy.array(list(diffEqZero))))
 
+    def test_strip_bd(self):
+        # SIR with birth and death, where the terms are not expanded
+        S, I, R, beta, gamma, mu = sympy.symbols('S I R beta gamma mu')
+        fx = sympy.Matrix([mu*(1 - S) - beta*S*I,
+                           beta*S*I - (gamma + mu)*I,
+                           gamma*I - mu*R])
+        bd_list = [mu, -mu*S, -mu*I, -mu*R]
+        fx1 = stripBDFromOde(fx, bd_list)
+        fx_true = sympy.Matrix([-beta*S*I, beta*S*I - gamma*I, gamma*I])
+        self.assertEqual(fx1, fx_true)
+
+        A = sympy.Matrix([[0, beta*S*I, 0], [0, 0, gamma*I], [0, 0, 0]])
+        self.assertEqual(pureTransitionToOde(A).expand(), fx_true)
+        fx2 = pureTransitionToOde(A, simplify=True)
+        self.assertEqual(fx2, sympy.simplify(fx_true))
+
+    def test_decomposition_deterministic(self):
+        # the decomposition must not depend on the hash of the sympy
+        # expressions, which changes with PYTHONHASHSEED
+        code = ("from pygom.model import common_models\n"
+                "from pygom.model._ode_composition import odeToPureTransition\n"
+                "ode = common_models.Robertson()\n"
+                "print(odeToPureTransition(ode.get_ode_eqn(),\n"
+                "                          ode._iterStateList()))\n")
+        out = list()
+        for seed in ['0', '1', '3']:
+            env = dict(os.environ, PYTHONHASHSEED=seed,
+                       PYTHONPATH=os.path.dirname(os.path.dirname(pygom.__file__)))
+            out.append(subprocess.check_output([sys.executable, '-c', code],
+                                               env=env))
+        self.assertEqual(len(set(out)), 1)
+
+        ode = common_models.Robertson()
+        A = odeToPureTransition(ode.get_ode_eqn(), ode._iterStateList())
+        y1, y2, y3 = sympy.symbols('y1 y2 y3', real=True)
+        A_true = sympy.Matrix([[0, 0, 0],
+                               [-0.04*y1 + 10000.0*y2*y3, 0, 0],
+                               [0, -30000000.0*y2**2, 0]])
+        self.assertEqual(sympy.simplify(A - A_true), sympy.zeros(3, 3))
+
+    def test_make_equation_pretty(self):
+        # beta has to be converted as a whole and not as b&eta;
+        # regardless of the order of the parameters
+        eq = _makeEquationPretty('beta*S*I + eta*I', ['eta', 'beta'])
+        self.assertEqual(eq, '&beta;*S*I + &eta;*I')
+        # nothing to convert without a greek parameter
+        eq = _makeEquationPretty('b*S*I + c*I', ['b', 'c'])
+        self.assertEqual(eq, 'b*S*I + c*I')
+
 
 if __name__ == '__main__':
     main()
@@ -5,7 +5,7 @@ import copy
 import numpy as np
 import scipy.integrate
 
-from pygom.model import common_models
+from pygom.model import common_models, ode_utils
 
 
 class TestJacobians(TestCase):
@@ -113,6 +113,19 @@ class TestJacobians(TestCase):
                 ff_temp[j] += self.h
                 J[i,j] = (self.ode.ode_and_forwardforward(ff_temp, self.t[self.index])[i] - J0[i])/self.h
 
+    def test_lambdaBackend(self):
+        """
+        The ode and Jacobian compiled via lambdify against those
+        compiled with the default backend
+        """
+        ode = common_models.SIR([('beta', 0.5), ('gamma', 1.0 / 3.0)])
+        ode._SC = ode_utils.compileCode(backend='lambda')
+
+        x = np.array([0.9, 0.1, 0.0])
+        self.assertTrue(np.allclose(ode.ode(x, 0), self.ode.ode(x, 0)))
+        self.assertTrue(np.allclose(ode.jacobian(x, 0),
+                                    self.ode.jacobian(x, 0)))
+
 
 if __name__ == '__main__':
     main()
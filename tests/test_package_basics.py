@@ -1,5 +1,7 @@
 from unittest import TestCase
 
+import importlib
+
 import pygom
 
 class TestPackageBasics(TestCase):
@@ -11,3 +13,11 @@ class TestPackageBasics(TestCase):
         self.assertGreater(len(pygom.__version__), 0,
                            '__version__ should not be empty')
 
+    def test_import_modules(self):
+        '''
+        Test the loss and ode composition modules import cleanly
+        '''
+        for name in ('pygom.loss.ode_loss',
+                     'pygom.loss.loss_type',
+                     'pygom.model._ode_composition'):
+            self.assertIsNotNone(importlib.import_module(name))
@@ -43,6 +43,17 @@ class TestModelEstimate(TestCase):
         sir_obj.gradient()
         sir_obj.hessian()
 
+    def test_cost_many(self):
+        y = self.solution[1::, 1:3]
+        sir_obj = SquareLoss(self.theta, self.ode, self.x0, self.t[0],
+                             self.t[1::], y, ['I', 'R'])
+
+        theta = np.array([self.theta, self.target, [0.4, 0.3]])
+        c = [sir_obj.cost(theta_i) for theta_i in theta]
+
+        self.assertTrue(np.allclose(sir_obj.cost_many(theta), c))
+        self.assertTrue(np.allclose(sir_obj.cost_many(theta, True), c))
+
     def test_SIR_Estimate_SquareLoss(self):
         y = self.solution[1::, 1:3]
         sir_obj = SquareLoss(self.theta, self.ode, self.x0, self.t[0], self.t[1::],